@@ -4,8 +4,16 @@ import asyncio
 import socket
 import struct
 import datetime
+import functools
+import collections
+import time
 import zipfile
 import shutil
+import threading
+import concurrent.futures
+import logging
+import logging.handlers
+import queue
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
@@ -19,23 +27,30 @@ RCON_HOST = os.environ.get("RCON_HOST", "mc")
 RCON_PORT = int(os.environ.get("RCON_PORT", "25575"))
 RCON_PASSWORD = os.environ.get("RCON_PASSWORD", "")
 MC_CONTAINER = os.environ.get("MC_CONTAINER", "mc-server")
-ALLOWED_USERS = [int(x) for x in os.environ.get(
-    "ALLOWED_USERS", "").split(",") if x]
-ALLOWED_ROLES = [int(x) for x in os.environ.get(
-    "ALLOWED_ROLES", "").split(",") if x]
+ALLOWED_USERS = frozenset(int(x) for x in os.environ.get(
+    "ALLOWED_USERS", "").split(",") if x)
+ALLOWED_ROLES = frozenset(int(x) for x in os.environ.get(
+    "ALLOWED_ROLES", "").split(",") if x)
 DISABLE_WHITELIST = os.environ.get(
     "DISABLE_WHITELIST", "false").lower() == "true"
 BRIDGE_CHANNEL_ID = int(os.environ.get("BRIDGE_CHANNEL_ID", "0"))
 COMMAND_CHANNEL_ID = int(os.environ.get("COMMAND_CHANNEL_ID", "0"))
+DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
 
 # Paths
 MINECRAFT_DATA_DIR = os.environ.get("MINECRAFT_DATA_DIR", "/minecraft-data")
 BACKUPS_DIR = os.environ.get(
     "BACKUPS_DIR", os.path.join(MINECRAFT_DATA_DIR, "backups"))
+# World data folders covered by /load
+WORLD_FOLDERS = ["World", "visualprospecting"]
+# Safety backups are written as one shard per world folder plus a manifest
+# (pre-restore-backup-<ts>.manifest) listing the shards that belong together
+SAFETY_SHARD_REGEX = re.compile(r"^(pre-restore-backup-\d{8}-\d{6})-(.+)\.zip$")
 
 # ═══════════════════════════════════════════════════════════════
 # BOT SETUP
 # ═══════════════════════════════════════════════════════════════
+logger = logging.getLogger("gtnh-bot")
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
@@ -44,30 +59,194 @@ docker_client = docker.from_env()
 # Chat regex: [12:34:56] [Server thread/INFO] [minecraft/DedicatedServer]: <PlayerName> Message
 # Adjusted to be more flexible for different server versions
 # Generic regex to capture any "INFO: <Player> Message" pattern, ignoring timestamp/thread info
-CHAT_REGEX = re.compile(r"INFO\]: <(.*?)> (.*)")
+# Bounded character classes keep matching linear on malformed or adversarial lines
+CHAT_REGEX = re.compile(r"INFO\]: <([^>]{1,32})> (.{1,512})")
+# Cheap substring gate so the capture regex only runs on likely chat lines
+CHAT_GATE = "INFO]: <"
+# RCON/Discord echo messages, skipped to avoid loops
+SKIP_REGEX = re.compile(r"\[(?:Rcon|Discord)\]")
+# Header of each frame in a non-TTY attach stream: stream type, 3 pad bytes, payload length
+DOCKER_FRAME_HEADER = struct.Struct('>BxxxL')
+# RCON packet header: length, request ID, type
+RCON_HEADER = struct.Struct('<iii')
+RCON_LENGTH = struct.Struct('<i')
+RCON_ID_TYPE = struct.Struct('<ii')
+# Longest payload the server puts in one response packet, in characters
+RCON_MAX_FRAGMENT = 4096
+
+# Hashes of (author, content) recently bridged Discord -> Minecraft, so the
+# server's echo of them is never bridged back
+_recent_sent = collections.deque(maxlen=128)
+_recent_sent_set = set()
+
+# get_backups() result as (monotonic timestamp, names); autocomplete calls it per keystroke
+_backups_cache = None
+BACKUPS_CACHE_TTL = 5.0
+
+# Last known server container and its status, refreshed at most every CONTAINER_CACHE_TTL
+# seconds so status checks (e.g. every bridged chat message) don't each hit dockerd
+_container_cache = {"at": None, "obj": None, "status": None}
+CONTAINER_CACHE_TTL = 2.0
 
 # Track if stream_logs is already running to prevent duplicates on reconnect
 stream_logs_running = False
 
+# Shared RCON connection, lazily (re)connected and reused across commands
+_rcon_singleton = None
+_rcon_lock = threading.Lock()
+
+# All RCON traffic is funneled through one worker thread fed by this queue
+rcon_queue = asyncio.Queue()
+_rcon_worker_thread = None
+
+# Minecraft -> Discord chat lines waiting to be batched into one channel.send
+chat_out_queue = asyncio.Queue()
+CHAT_BATCH_MAX_LINES = 10
+CHAT_BATCH_MAX_CHARS = 1990
+
 # ═══════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ═══════════════════════════════════════════════════════════════
 
 
+def setup_logging():
+    """Route all logging through a queue so stderr writes happen on a background thread."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+    listener.start()
+    return listener
+
+
 def get_backups():
     """List ZIP files in the backup directory, sorted by modification time (newest first)."""
+    global _backups_cache
+    if _backups_cache and time.monotonic() - _backups_cache[0] < BACKUPS_CACHE_TTL:
+        return _backups_cache[1]
+
     if not os.path.exists(BACKUPS_DIR):
         return []
 
-    backups = []
-    for f in os.listdir(BACKUPS_DIR):
-        if f.endswith(".zip"):
-            path = os.path.join(BACKUPS_DIR, f)
-            backups.append((f, os.path.getmtime(path)))
+    # is_file() comes from the directory read; stat() is still one syscall per
+    # backup on Linux, which is why the result is cached above
+    with os.scandir(BACKUPS_DIR) as it:
+        backups = [(e.name, e.stat().st_mtime) for e in it
+                   if e.name.endswith(".zip") and e.is_file()]
 
     # Sort by time descending
     backups.sort(key=lambda x: x[1], reverse=True)
-    return [b[0] for b in backups]
+    result = [b[0] for b in backups]
+    _backups_cache = (time.monotonic(), result)
+    return result
+
+
+def remember_bridged_message(author, content):
+    key = hash((author, content))
+    if len(_recent_sent) == _recent_sent.maxlen:
+        oldest = _recent_sent.popleft()
+        if oldest not in _recent_sent:
+            _recent_sent_set.discard(oldest)
+    _recent_sent.append(key)
+    _recent_sent_set.add(key)
+
+
+def invalidate_backups_cache():
+    global _backups_cache
+    _backups_cache = None
+
+
+def zip_world_folder(folder, zip_path):
+    """Write one world folder into its own uncompressed ZIP. Runs in a worker process."""
+    folder_path = os.path.join(MINECRAFT_DATA_DIR, folder)
+    # Stored, not deflated: region files are already compressed and
+    # this backup is only a short-lived safety net
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zipf:
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                arcname = os.path.relpath(file_path, MINECRAFT_DATA_DIR)
+                zipf.write(file_path, arcname)
+
+
+def write_safety_backup(timestamp, folders):
+    """Zip each world folder into its own shard in parallel and record the set in a manifest."""
+    names = [f"pre-restore-backup-{timestamp}-{f}.zip" for f in folders]
+    paths = [os.path.join(BACKUPS_DIR, name) for name in names]
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(folders)) as pool:
+            for future in [pool.submit(zip_world_folder, folder, path)
+                           for folder, path in zip(folders, paths)]:
+                future.result()
+    except Exception:
+        # Shards left without a manifest would look like complete single-folder backups
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+    manifest_path = os.path.join(
+        BACKUPS_DIR, f"pre-restore-backup-{timestamp}.manifest")
+    with open(manifest_path, "w") as f:
+        f.write("\n".join(names) + "\n")
+    return names
+
+
+def resolve_backup(backup_file):
+    """Return (ZIP names to extract, world folders they replace) for a /load choice."""
+    match = SAFETY_SHARD_REGEX.match(backup_file)
+    if not match or match.group(2) not in WORLD_FOLDERS:
+        return [backup_file], WORLD_FOLDERS
+
+    # Any shard of a safety backup restores the whole set listed in its manifest
+    archives = [backup_file]
+    manifest_path = os.path.join(BACKUPS_DIR, f"{match.group(1)}.manifest")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            archives = [line.strip() for line in f if line.strip()]
+    # Only the folders the shards contain are replaced; the rest stay untouched
+    return archives, [SAFETY_SHARD_REGEX.match(a).group(2) for a in archives]
+
+
+def remove_trashed_folders(trash_paths):
+    """Delete the world folders one restore moved aside (World.trash-<ts>, ...)."""
+    for trash_path in trash_paths:
+        try:
+            shutil.rmtree(trash_path)
+        except OSError as e:
+            logger.warning("Failed to remove %s: %s", trash_path, e)
+
+
+def extract_zip_members(zip_path, names, dest):
+    """Extract the given members of a ZIP into dest. Runs in a worker process."""
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        for name in names:
+            try:
+                zipf.extract(name, dest)
+            except FileExistsError:
+                # Another worker created the parent directory between
+                # zipfile's exists check and its makedirs; the retry sees it
+                zipf.extract(name, dest)
+
+
+def extract_zip_parallel(zip_path, dest):
+    """Extract a ZIP with one worker process per CPU, each handling a slice of the members."""
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        names = zipf.namelist()
+    workers = max(1, min(os.cpu_count() or 1, len(names)))
+    shards = [names[i::workers] for i in range(workers)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(extract_zip_members, zip_path, shard, dest)
+                       for shard in shards]:
+            future.result()
 
 
 class SimpleRCON:
@@ -75,16 +254,35 @@ class SimpleRCON:
         self.host = host
         self.port = port
         self.password = password
+        self.password_bytes = password.encode('utf-8')
         self.socket = None
+        self.rfile = None
+        self.wfile = None
         self.request_id = 0
 
     def connect(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
         self.socket.settimeout(5)
         self.socket.connect((self.host, self.port))
-        self._send(3, self.password)
+        # Buffered file wrappers so a whole packet is read/written per syscall
+        self.rfile = self.socket.makefile('rb', buffering=8192)
+        self.wfile = self.socket.makefile('wb', buffering=8192)
+        self._send(3, self.password_bytes)
+        req_id, _ = self._read()
+        if req_id == -1:
+            raise ConnectionError("RCON authentication failed")
 
     def disconnect(self):
+        for f in (self.rfile, self.wfile):
+            if f:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self.rfile = None
+        self.wfile = None
         if self.socket:
             self.socket.close()
             self.socket = None
@@ -96,36 +294,58 @@ class SimpleRCON:
         self.request_id += 1
         # Packet format: Length (4), Request ID (4), Type (4), Payload (N), Padding (2)
         # Types: 3=Login, 2=Command, 0=Response
-        data = struct.pack('<ii', self.request_id, type) + \
-            payload.encode('utf-8') + b'\x00\x00'
-        length = struct.pack('<i', len(data))
-        self.socket.send(length + data)
-
-        return self._read()
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        length = 4 + 4 + len(payload) + 2
+        packet = bytearray(4 + length)  # zero-filled, so the padding is already there
+        RCON_HEADER.pack_into(packet, 0, length, self.request_id, type)
+        packet[RCON_HEADER.size:RCON_HEADER.size + len(payload)] = payload
+        self.wfile.write(packet)
+        self.wfile.flush()
+        return self.request_id
 
     def _read(self):
+        """Read one packet and return its (request ID, payload)."""
         # Read length
         length_data = self._recv_exact(4)
-        length = struct.unpack('<i', length_data)[0]
+        length = RCON_LENGTH.unpack(length_data)[0]
 
         # Read packet data
         data = self._recv_exact(length)
-        req_id, type = struct.unpack('<ii', data[:8])
+        req_id, type = RCON_ID_TYPE.unpack_from(data)
         payload = data[8:-2].decode('utf-8')
 
-        return payload
+        return req_id, payload
 
     def _recv_exact(self, n):
-        data = b''
-        while len(data) < n:
-            chunk = self.socket.recv(n - len(data))
-            if not chunk:
-                raise ConnectionError("Connection closed")
-            data += chunk
+        data = self.rfile.read(n)
+        if len(data) < n:
+            raise EOFError("Connection closed")
         return data
 
     def command(self, cmd):
-        return self._send(2, cmd)
+        command_id = self._send(2, cmd)
+        # Packets with any other ID belong to an earlier command and are dropped
+        while True:
+            req_id, payload = self._read()
+            if req_id == command_id:
+                break
+        if len(payload) < RCON_MAX_FRAGMENT:
+            return payload
+
+        # Replies over 4096 characters arrive split across several packets with no
+        # end marker. The server answers this unknown-type packet only after the
+        # whole reply, so its response marks where the command's output ends. It is
+        # sent only once a reply is underway: the server reads one packet per recv
+        # and drops the connection if two arrive together.
+        end_id = self._send(0, "")
+        parts = [payload]
+        while True:
+            req_id, payload = self._read()
+            if req_id == end_id:
+                return "".join(parts)
+            if req_id == command_id:
+                parts.append(payload)
 
     def __enter__(self):
         self.connect()
@@ -150,8 +370,7 @@ async def is_authorized(interaction: discord.Interaction) -> bool:
 
     # Check roles
     if isinstance(interaction.user, discord.Member):
-        user_role_ids = [role.id for role in interaction.user.roles]
-        if any(role_id in ALLOWED_ROLES for role_id in user_role_ids):
+        if not ALLOWED_ROLES.isdisjoint(role.id for role in interaction.user.roles):
             return True
 
     await interaction.response.send_message("❌ You are not authorized to run this command.", ephemeral=True)
@@ -165,33 +384,173 @@ def get_container():
         return None
 
 
+def _cached_container_status(ttl: float = CONTAINER_CACHE_TTL):
+    """Return (container, status), reusing the last lookup if it is younger than ttl."""
+    at = _container_cache["at"]
+    if at is None or time.monotonic() - at > ttl:
+        container = get_container()
+        _container_cache.update(
+            at=time.monotonic(), obj=container,
+            status=container.status if container else None)
+    return _container_cache["obj"], _container_cache["status"]
+
+
+def invalidate_container_cache():
+    _container_cache["at"] = None
+
+
 def is_server_running() -> bool:
-    container = get_container()
-    return container is not None and container.status == "running"
+    return _cached_container_status()[1] == "running"
+
+
+def require(auth=True, running=False):
+    """Decorate a slash command with the authorization and/or server-running checks."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+            if auth and not await is_authorized(interaction):
+                return
+            if running and not is_server_running():
+                await interaction.response.send_message("❌ Server is not running!")
+                return
+            return await func(interaction, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _pooled_command(command: str) -> str:
+    """Run a command over the shared RCON connection, reconnecting once if it dropped."""
+    global _rcon_singleton
+    with _rcon_lock:
+        while True:
+            reused = _rcon_singleton is not None and _rcon_singleton.socket is not None
+            if not reused:
+                _rcon_singleton = SimpleRCON(
+                    RCON_HOST, RCON_PORT, RCON_PASSWORD)
+                try:
+                    _rcon_singleton.connect()
+                except Exception:
+                    _rcon_singleton.disconnect()
+                    _rcon_singleton = None
+                    raise
+            try:
+                return _rcon_singleton.command(command)
+            except Exception as e:
+                # Any failure can leave a partial packet on the socket, so drop it
+                _rcon_singleton.disconnect()
+                _rcon_singleton = None
+                # Only retry when a reused connection had already been closed by the
+                # server; after a timeout the command may have run and must not run twice
+                if not reused or not isinstance(e, (BrokenPipeError, ConnectionResetError, EOFError)):
+                    raise
+
+
+def _resolve_rcon_future(fut, response, error):
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(response)
+
+
+def _rcon_worker(loop):
+    """Serve queued RCON commands one at a time on a dedicated thread."""
+    while True:
+        command, fut = asyncio.run_coroutine_threadsafe(
+            rcon_queue.get(), loop).result()
+        try:
+            response, error = _pooled_command(command), None
+        except Exception as e:
+            response, error = None, e
+        loop.call_soon_threadsafe(_resolve_rcon_future, fut, response, error)
+
 
+def start_rcon_worker():
+    global _rcon_worker_thread
+    if _rcon_worker_thread is None:
+        _rcon_worker_thread = threading.Thread(
+            target=_rcon_worker, args=(bot.loop,), daemon=True, name="rcon-worker")
+        _rcon_worker_thread.start()
 
-def send_rcon_command(command: str) -> str:
+
+async def _rcon_call(command: str) -> str:
+    """Queue a command for the RCON worker and wait for its raw response."""
+    start_rcon_worker()
+    fut = bot.loop.create_future()
+    await rcon_queue.put((command, fut))
+    return await fut
+
+
+async def send_rcon(command: str) -> str:
     try:
-        print(f"DEBUG: Sending RCON command: {command}")
-        with SimpleRCON(RCON_HOST, RCON_PORT, RCON_PASSWORD) as mcr:
-            response = mcr.command(command)
-            print(f"DEBUG: RCON Response: {response}")
-            return response if response else "Command sent."
+        logger.debug("Sending RCON command: %s", command)
+        response = await _rcon_call(command)
+        logger.debug("RCON response: %s", response)
+        return response if response else "Command sent."
     except Exception as e:
-        print(f"DEBUG: RCON Error: {e}")
+        logger.warning("RCON error: %s", e)
         return f"RCON Error: {e}"
 
 
 async def wait_for_server_ready(timeout: int = 180) -> bool:
-    for _ in range(timeout):
+    """Poll RCON with exponential backoff until the server answers or timeout seconds pass."""
+    delay = 0.25
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
         try:
-            with SimpleRCON(RCON_HOST, RCON_PORT, RCON_PASSWORD) as mcr:
-                mcr.command("list")
-                return True
-        except:
-            await asyncio.sleep(1)
+            await _rcon_call("list")
+            return True
+        except Exception:
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 1.5, 4.0)
     return False
 
+
+FORCE_KILLED_WARNING = ("⚠️ **Server did not shut down in time and was force-killed.** "
+                        "The final world save may be incomplete.")
+
+
+async def graceful_stop(container, interaction=None, timeout: int = 120) -> bool:
+    """Signal the server to shut down and poll until it exits, killing it after timeout seconds."""
+    # Same signal `docker stop` would send: triggers a graceful shutdown with autosave
+    stop_signal = container.attrs["Config"].get("StopSignal") or "SIGTERM"
+    try:
+        # The running check may be stale, so the server could already be down
+        await asyncio.to_thread(container.reload)
+        if container.status != "running":
+            return True
+        try:
+            await asyncio.to_thread(container.kill, signal=stop_signal)
+        except docker.errors.APIError as e:
+            # 409: it exited between the reload and the kill
+            if e.status_code == 409:
+                return True
+            raise
+
+        start = time.monotonic()
+        next_update = 10
+        while (elapsed := time.monotonic() - start) < timeout:
+            await asyncio.sleep(2)
+            await asyncio.to_thread(container.reload)
+            if container.status in ("exited", "dead"):
+                return True
+            if interaction is not None and elapsed >= next_update:
+                next_update += 10
+                await interaction.edit_original_response(
+                    content=f"🛑 Stopping server gracefully... ({int(elapsed)}s)")
+
+        try:
+            await asyncio.to_thread(container.kill)
+        except docker.errors.APIError as e:
+            if e.status_code == 409:
+                return True
+            raise
+        await asyncio.to_thread(container.wait, timeout=30)
+        return False
+    finally:
+        invalidate_container_cache()
+
 # ═══════════════════════════════════════════════════════════════
 # BOT EVENTS
 # ═══════════════════════════════════════════════════════════════
@@ -199,24 +558,25 @@ async def wait_for_server_ready(timeout: int = 180) -> bool:
 
 @bot.event
 async def on_ready():
-    print(f"✅ Bot is online as {bot.user}")
+    logger.info("✅ Bot is online as %s", bot.user)
+    start_rcon_worker()
 
     # Sync slash commands
     try:
         synced = await bot.tree.sync()
-        print(f"✅ Synced {len(synced)} slash commands")
+        logger.info("✅ Synced %d slash commands", len(synced))
     except Exception as e:
-        print(f"❌ Failed to sync commands: {e}")
+        logger.error("❌ Failed to sync commands: %s", e)
 
     if BRIDGE_CHANNEL_ID != 0:
         if not chat_bridge.is_running():
             chat_bridge.start()
-        print(f"✅ Chat bridge enabled for channel {BRIDGE_CHANNEL_ID}")
+        logger.info("✅ Chat bridge enabled for channel %s", BRIDGE_CHANNEL_ID)
     else:
-        print("⚠️ BRIDGE_CHANNEL_ID not set. Chat bridge disabled.")
+        logger.warning("⚠️ BRIDGE_CHANNEL_ID not set. Chat bridge disabled.")
 
     if COMMAND_CHANNEL_ID != 0:
-        print(f"✅ Commands restricted to channel {COMMAND_CHANNEL_ID}")
+        logger.info("✅ Commands restricted to channel %s", COMMAND_CHANNEL_ID)
 
     # Start streaming logs (only if not already running)
     global stream_logs_running
@@ -236,13 +596,34 @@ async def on_message(message):
             if not is_server_running():
                 return
             safe_content = message.content.replace("\n", " ").replace('"', "'")
-            send_rcon_command(
+            remember_bridged_message(message.author.display_name, safe_content)
+            await send_rcon(
                 f"say [Discord] <{message.author.display_name}> {safe_content}")
 
 
-@tasks.loop(seconds=2)
+@tasks.loop(seconds=1)
 async def chat_bridge():
-    pass
+    """Flush queued Minecraft chat to Discord, coalescing lines into few sends."""
+    if chat_out_queue.empty():
+        return
+    channel = bot.get_channel(BRIDGE_CHANNEL_ID)
+    if not channel:
+        return
+
+    batch, size = [], 0
+    try:
+        while not chat_out_queue.empty():
+            line = chat_out_queue.get_nowait()[:CHAT_BATCH_MAX_CHARS]
+            if batch and (len(batch) >= CHAT_BATCH_MAX_LINES or
+                          size + 1 + len(line) > CHAT_BATCH_MAX_CHARS):
+                await channel.send("\n".join(batch))
+                batch, size = [], 0
+            batch.append(line)
+            size += len(line) + 1
+        if batch:
+            await channel.send("\n".join(batch))
+    except Exception as e:
+        logger.warning("Chat bridge error: %s", e)
 
 
 async def stream_logs():
@@ -255,52 +636,113 @@ async def stream_logs():
         return
     while True:
         try:
-            container = get_container()
-            if not container or container.status != "running":
+            container, status = _cached_container_status()
+            if status != "running":
                 await asyncio.sleep(10)
                 continue
-            await asyncio.to_thread(process_log_stream, container, channel, bot.loop)
+            await follow_container_output(container)
             await asyncio.sleep(5)
         except Exception as e:
-            print(f"Stream error: {e}")
+            logger.warning("Stream error: %s", e)
             await asyncio.sleep(5)
 
 
-def process_log_stream(container, channel, loop):
+class LogStreamParser:
+    """Turn raw bytes from a container attach socket into log lines."""
+
+    def __init__(self, multiplexed):
+        # Without a TTY, Docker wraps output in frames with an 8-byte header
+        self.multiplexed = multiplexed
+        self.frames = bytearray()
+        # Pending partial line per stream type (1 = stdout, 2 = stderr), so a
+        # stderr frame can't land in the middle of an unfinished stdout line
+        self.buffers = collections.defaultdict(bytearray)
+
+    def feed(self, data):
+        if not self.multiplexed:
+            return self._split_lines(self.buffers[1], data)
+
+        self.frames.extend(data)
+        lines = []
+        while len(self.frames) >= DOCKER_FRAME_HEADER.size:
+            stream, length = DOCKER_FRAME_HEADER.unpack_from(self.frames)
+            end = DOCKER_FRAME_HEADER.size + length
+            if len(self.frames) < end:
+                break
+            lines += self._split_lines(
+                self.buffers[stream], self.frames[DOCKER_FRAME_HEADER.size:end])
+            del self.frames[:end]
+        return lines
+
+    @staticmethod
+    def _split_lines(buffer, data):
+        # Split on raw bytes and decode whole lines only, so multibyte characters
+        # spanning two reads survive and the pending tail is never re-copied
+        buffer.extend(data)
+        lines = []
+        start = 0
+        while (nl := buffer.find(b'\n', start)) >= 0:
+            lines.append(buffer[start:nl].decode('utf-8', errors='replace'))
+            start = nl + 1
+        del buffer[:start]
+        return lines
+
+
+async def follow_container_output(container):
+    """Read the container's live output on the event loop until the stream closes."""
+    loop = asyncio.get_running_loop()
+    attached = await asyncio.to_thread(
+        docker_client.api.attach_socket, container.id,
+        params={"stdout": 1, "stderr": 1, "stream": 1, "logs": 0})
+    # docker-py hands back a SocketIO wrapper over the raw unix socket
+    sock = getattr(attached, "_sock", attached)
+    sock.setblocking(False)
+    parser = LogStreamParser(multiplexed=not container.attrs["Config"]["Tty"])
+    closed = loop.create_future()
+
+    def on_readable():
+        try:
+            data = sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logger.warning("Log stream interrupted: %s", e)
+            data = b""
+        if not data:
+            if not closed.done():
+                closed.set_result(None)
+            return
+        for line in parser.feed(data):
+            handle_log_line(line)
+
+    loop.add_reader(sock.fileno(), on_readable)
     try:
-        # Use a specialized iterator to handle byte streams and newlines
-        log_stream = container.logs(stream=True, follow=True, tail=0)
-        buffer = ""
-
-        for chunk in log_stream:
-            # Decode chunk to string (handling potential partial multibyte characters is hard here,
-            # but utf-8 errors='replace' is safe enough for logs)
-            decoded_chunk = chunk.decode('utf-8', errors='replace')
-            buffer += decoded_chunk
-
-            while '\n' in buffer:
-                line, buffer = buffer.split('\n', 1)
-                line = line.strip()
-                if not line:
-                    continue
-
-                print(f"DEBUG LOG: {line}")
-
-                # Skip RCON/Discord echo messages to avoid loops
-                if "[Rcon]" in line or "[Discord]" in line:
-                    continue
-
-                match = CHAT_REGEX.search(line)
-                if match:
-                    player, message = match.groups()
-                    print(
-                        f"DEBUG: Matched Chat - Player: {player}, Msg: {message}")
-                    if player == "Discord":
-                        continue
-                    asyncio.run_coroutine_threadsafe(
-                        channel.send(f"**<{player}>** {message}"), loop)
-    except Exception as e:
-        print(f"Log stream interrupted: {e}")
+        await closed
+    finally:
+        loop.remove_reader(sock.fileno())
+        attached.close()
+
+
+def handle_log_line(line):
+    line = line.strip()
+    if not line:
+        return
+
+    logger.debug("Server log: %s", line)
+
+    if CHAT_GATE not in line or SKIP_REGEX.search(line):
+        return
+
+    match = CHAT_REGEX.search(line)
+    if not match:
+        return
+    player = match.group(1)
+    message = match.group(2)
+    logger.debug("Matched chat - player: %s, msg: %s", player, message)
+    if player == "Discord" or hash((player, message)) in _recent_sent_set:
+        return
+    # Batched and sent by the chat_bridge loop
+    chat_out_queue.put_nowait(f"**<{player}>** {message}")
 
 # ═══════════════════════════════════════════════════════════════
 # SLASH COMMANDS
@@ -308,15 +750,12 @@ def process_log_stream(container, channel, loop):
 
 
 @bot.tree.command(name="status", description="Check if the server is running")
+@require()
 async def status(interaction: discord.Interaction):
-    if not await is_authorized(interaction):
-        return
-
     if is_server_running():
         await interaction.response.defer()
         try:
-            # Run RCON in executor to avoid blocking
-            response = await asyncio.to_thread(send_rcon_command, "list")
+            response = await send_rcon("list")
             await interaction.followup.send(f"✅ **Server is ONLINE**\n```{response}```")
         except Exception as e:
             await interaction.followup.send("✅ **Server is ONLINE** (RCON unavailable)")
@@ -325,10 +764,8 @@ async def status(interaction: discord.Interaction):
 
 
 @bot.tree.command(name="start", description="Start the Minecraft server")
+@require()
 async def start(interaction: discord.Interaction):
-    if not await is_authorized(interaction):
-        return
-
     if is_server_running():
         await interaction.response.send_message("⚠️ Server is already running!")
         return
@@ -341,6 +778,7 @@ async def start(interaction: discord.Interaction):
     await interaction.response.send_message("🚀 Starting server...")
     try:
         container.start()
+        invalidate_container_cache()
         message = await interaction.original_response()
         await message.edit(content="⏳ Server is starting. This may take a few minutes...")
 
@@ -353,10 +791,8 @@ async def start(interaction: discord.Interaction):
 
 
 @bot.tree.command(name="stop", description="Stop the Minecraft server gracefully")
+@require()
 async def stop(interaction: discord.Interaction):
-    if not await is_authorized(interaction):
-        return
-
     if not is_server_running():
         await interaction.response.send_message("⚠️ Server is not running!")
         return
@@ -364,20 +800,20 @@ async def stop(interaction: discord.Interaction):
     await interaction.response.send_message("🛑 Stopping server...")
     try:
         container = get_container()
-        # Use container stop which triggers graceful shutdown with autosave
-        await asyncio.to_thread(container.stop, timeout=120)
+        stopped_cleanly = await graceful_stop(container, interaction)
 
         message = await interaction.original_response()
-        await message.edit(content="✅ **Server stopped successfully!**")
+        if stopped_cleanly:
+            await message.edit(content="✅ **Server stopped successfully!**")
+        else:
+            await message.edit(content=FORCE_KILLED_WARNING)
     except Exception as e:
         await interaction.followup.send(f"❌ Error stopping server: {e}")
 
 
 @bot.tree.command(name="restart", description="Restart the Minecraft server")
+@require()
 async def restart(interaction: discord.Interaction):
-    if not await is_authorized(interaction):
-        return
-
     await interaction.response.send_message("🔄 Restarting server...")
     container = get_container()
     if not container:
@@ -389,12 +825,13 @@ async def restart(interaction: discord.Interaction):
             message = await interaction.original_response()
             await message.edit(content="🛑 Stopping server gracefully...")
 
-            # Use container stop which triggers graceful shutdown with autosave
-            await asyncio.to_thread(container.stop, timeout=120)
+            if not await graceful_stop(container, interaction):
+                await interaction.followup.send(FORCE_KILLED_WARNING)
 
         message = await interaction.original_response()
         await message.edit(content="🚀 Starting server...")
         container.start()
+        invalidate_container_cache()
 
         if await wait_for_server_ready(timeout=300):
             await message.edit(content="✅ **Server restarted and ready!**")
@@ -405,53 +842,33 @@ async def restart(interaction: discord.Interaction):
 
 
 @bot.tree.command(name="say", description="Send a message to the server")
+@require(running=True)
 async def say(interaction: discord.Interaction, message: str):
-    if not await is_authorized(interaction):
-        return
-
-    if not is_server_running():
-        await interaction.response.send_message("❌ Server is not running!")
-        return
-
-    await asyncio.to_thread(send_rcon_command, f"say [Discord] {interaction.user.display_name}: {message}")
+    await send_rcon(f"say [Discord] {interaction.user.display_name}: {message}")
     await interaction.response.send_message(f"💬 Message sent!")
 
 
 @bot.tree.command(name="cmd", description="Execute a server command")
+@require(running=True)
 async def cmd(interaction: discord.Interaction, command: str):
-    if not await is_authorized(interaction):
-        return
-
-    if not is_server_running():
-        await interaction.response.send_message("❌ Server is not running!")
-        return
-
     await interaction.response.defer()
-    response = await asyncio.to_thread(send_rcon_command, command)
+    response = await send_rcon(command)
     if len(response) > 1900:
         response = response[:1900] + "..."
     await interaction.followup.send(f"```\n{response}\n```")
 
 
 @bot.tree.command(name="players", description="List online players")
+@require(running=True)
 async def players(interaction: discord.Interaction):
-    if not await is_authorized(interaction):
-        return
-
-    if not is_server_running():
-        await interaction.response.send_message("❌ Server is not running!")
-        return
-
     await interaction.response.defer()
-    response = await asyncio.to_thread(send_rcon_command, "list")
+    response = await send_rcon("list")
     await interaction.followup.send(f"👥 **Online Players:**\n```{response}```")
 
 
 @bot.tree.command(name="logs", description="Show recent server logs")
+@require()
 async def logs(interaction: discord.Interaction, lines: int = 20):
-    if not await is_authorized(interaction):
-        return
-
     container = get_container()
     if not container:
         await interaction.response.send_message("❌ Container not found.")
@@ -468,30 +885,23 @@ async def logs(interaction: discord.Interaction, lines: int = 20):
 
 
 @bot.tree.command(name="save", description="Trigger a server save/backup")
+@require(running=True)
 async def save(interaction: discord.Interaction):
-    if not await is_authorized(interaction):
-        return
-
-    if not is_server_running():
-        await interaction.response.send_message("❌ Server is not running!")
-        return
-
     await interaction.response.defer()
     await interaction.followup.send("💾 Starting backup...")
-    response = await asyncio.to_thread(send_rcon_command, "backup start")
+    response = await send_rcon("backup start")
     await interaction.followup.send(f"✅ **Backup triggered!**\n```{response}```")
 
 
 @bot.tree.command(name="load", description="Restore a server backup")
 @app_commands.describe(backup_file="The backup ZIP file to restore")
+@require()
 async def load(interaction: discord.Interaction, backup_file: str):
-    if not await is_authorized(interaction):
-        return
-
-    backup_path = os.path.join(BACKUPS_DIR, backup_file)
-    if not os.path.exists(backup_path):
-        await interaction.response.send_message(f"❌ Backup file not found: `{backup_file}`", ephemeral=True)
-        return
+    archives, restored_folders = resolve_backup(backup_file)
+    for archive in archives:
+        if not os.path.exists(os.path.join(BACKUPS_DIR, archive)):
+            await interaction.response.send_message(f"❌ Backup file not found: `{archive}`", ephemeral=True)
+            return
 
     await interaction.response.send_message("⏳ **Restoring backup...** This will stop the server.")
 
@@ -500,9 +910,10 @@ async def load(interaction: discord.Interaction, backup_file: str):
         if is_server_running():
             await interaction.edit_original_response(content="🛑 Stopping server gracefully...")
 
-            # Use container stop which triggers graceful shutdown with autosave
             container = get_container()
-            await asyncio.to_thread(container.stop, timeout=120)
+            if not await graceful_stop(container, interaction):
+                # The safety backup below captures whatever state the kill left
+                await interaction.followup.send(FORCE_KILLED_WARNING)
     except Exception as e:
         await interaction.followup.send(f"❌ Error stopping server: {e}")
         return
@@ -511,23 +922,16 @@ async def load(interaction: discord.Interaction, backup_file: str):
     await interaction.edit_original_response(content="💾 Creating temporary backup of current state...")
     try:
         timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-        temp_backup_name = f"pre-restore-backup-{timestamp}.zip"
-        temp_backup_path = os.path.join(BACKUPS_DIR, temp_backup_name)
-
-        def zip_current_state():
-            with zipfile.ZipFile(temp_backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for folder in ["World", "visualprospecting"]:
-                    folder_path = os.path.join(MINECRAFT_DATA_DIR, folder)
-                    if os.path.exists(folder_path):
-                        for root, dirs, files in os.walk(folder_path):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                arcname = os.path.relpath(
-                                    file_path, MINECRAFT_DATA_DIR)
-                                zipf.write(file_path, arcname)
-
-        await asyncio.to_thread(zip_current_state)
-        await interaction.followup.send(f"✅ Safety backup created: `{temp_backup_name}`")
+        folders = [f for f in WORLD_FOLDERS
+                   if os.path.exists(os.path.join(MINECRAFT_DATA_DIR, f))]
+        temp_backup_names = []
+        if folders:
+            temp_backup_names = await asyncio.to_thread(
+                write_safety_backup, timestamp, folders)
+            invalidate_backups_cache()
+        created = ", ".join(f"`{n}`" for n in temp_backup_names) or "nothing to back up"
+        await interaction.followup.send(
+            f"✅ Safety backup created: {created} (loading any one restores all of them)")
     except Exception as e:
         await interaction.followup.send(f"❌ Failed to create safety backup: {e}. Aborting restore.")
         return
@@ -536,17 +940,25 @@ async def load(interaction: discord.Interaction, backup_file: str):
     await interaction.edit_original_response(content="📂 Extracting backup...")
     try:
         def restore_files():
-            # Delete existing folders
-            for folder in ["World", "visualprospecting"]:
+            # Move existing folders aside; a rename is instant, deleting them is not
+            suffix = f".trash-{int(time.time())}"
+            trash_paths = []
+            for folder in restored_folders:
                 folder_path = os.path.join(MINECRAFT_DATA_DIR, folder)
                 if os.path.exists(folder_path):
-                    shutil.rmtree(folder_path)
-
-            # Extract zip
-            with zipfile.ZipFile(backup_path, 'r') as zipf:
-                zipf.extractall(MINECRAFT_DATA_DIR)
-
-        await asyncio.to_thread(restore_files)
+                    os.rename(folder_path, folder_path + suffix)
+                    trash_paths.append(folder_path + suffix)
+
+            # Extract zip(s)
+            for archive in archives:
+                extract_zip_parallel(
+                    os.path.join(BACKUPS_DIR, archive), MINECRAFT_DATA_DIR)
+            return trash_paths
+
+        trash_paths = await asyncio.to_thread(restore_files)
+        # Old world data is only deleted once the restore succeeded; trash left
+        # by earlier failed restores is kept for manual recovery
+        bot.loop.run_in_executor(None, remove_trashed_folders, trash_paths)
     except Exception as e:
         await interaction.followup.send(f"❌ Restore failed: {e}. Check server data!")
         return
@@ -556,6 +968,7 @@ async def load(interaction: discord.Interaction, backup_file: str):
     try:
         container = get_container()
         container.start()
+        invalidate_container_cache()
         await interaction.followup.send(f"✅ **Backup `{backup_file}` restored successfully!** Server is booting.")
     except Exception as e:
         await interaction.followup.send(f"❌ Failed to start server: {e}")
@@ -570,11 +983,11 @@ async def load_autocomplete(interaction: discord.Interaction, current: str):
     ][:25]  # Discord limit is 25 choices
 
 
-@bot.tree.command(name="help", description="Show help menu")
-async def help(interaction: discord.Interaction):
-    help_text = """
-**🎮 GTNH Discord Server Manager**
-
+# Built once at import; every /help reuses the same embed
+HELP_EMBED = discord.Embed(
+    title="🎮 GTNH Discord Server Manager",
+    color=0x00ff88,
+    description="""
 **Server Control:**
 • `/status` - Check if server is running
 • `/start` - Start the server
@@ -591,8 +1004,12 @@ async def help(interaction: discord.Interaction):
 • `/save` - Trigger a server backup
 • `/load <backup_file>` - Restore a backup (stops server)
 • `/help` - Show this message
-"""
-    await interaction.response.send_message(help_text)
+""")
+
+
+@bot.tree.command(name="help", description="Show help menu")
+async def help(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=HELP_EMBED)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -603,5 +1020,10 @@ if __name__ == "__main__":
         print("❌ ERROR: DISCORD_TOKEN environment variable not set!")
         exit(1)
 
-    print("🤖 Starting Discord bot...")
-    bot.run(DISCORD_TOKEN)
+    log_listener = setup_logging()
+    logger.info("🤖 Starting Discord bot...")
+    try:
+        # log_handler=None: discord.py's records go through our queue handler too
+        bot.run(DISCORD_TOKEN, log_handler=None)
+    finally:
+        log_listener.stop()